@@ -1,12 +1,21 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 import os
+import tempfile
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
+from typing import Iterator
 import pandas as pd
 import sqlite3
 import streamlit as st
 
+try:
+    import duckdb  # optional, nur für den schnellen "Großer Import"-Pfad
+except ImportError:
+    duckdb = None
+
 # ---------------------------------------------------------------------------
 # Basis-Konfiguration & Pfade
 # ---------------------------------------------------------------------------
@@ -39,35 +48,289 @@ st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
 # ---------------------------------------------------------------------------
 # Datenbank-Initialisierung
 # ---------------------------------------------------------------------------
+# Vom Benutzer befüllte Spalten (id, Timestamp und Gesamt setzt SQLite)
+DB_COLUMNS = (
+    "Material", "Materialkurztext", "Werk", "Kostenstelle", "Kostenstellenbez",
+    "Menge", "Einzelpreis", "Warengruppe", "Jahr", "Monat", "Lieferant",
+)
+INSERT_SQL = (
+    f"INSERT INTO einkaeufe ({', '.join(DB_COLUMNS)}) "
+    f"VALUES ({', '.join('?' * len(DB_COLUMNS))})"
+)
+
+# Sekundärindizes für Filter (Analyse) und Sortierung (Löschen)
+INDEXES = {
+    "idx_ksb": "Kostenstellenbez",
+    "idx_wg": "Warengruppe",
+    "idx_lief": "Lieferant",
+    # Aufsteigend: rückwärts gelesen liefert der Index "Timestamp DESC, id DESC"
+    # ohne zusätzliche Sortierung (die rowid ist Teil jedes Index-Eintrags)
+    "idx_timestamp": "Timestamp",
+}
+
+def create_indexes(conn: sqlite3.Connection) -> None:
+    for name, columns in INDEXES.items():
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON einkaeufe({columns})")
+
+def drop_indexes(conn: sqlite3.Connection) -> None:
+    for name in INDEXES:
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+def open_conn() -> sqlite3.Connection:
+    # Autocommit-Modus: Transaktionen werden explizit über write_transaction()
+    # geöffnet.
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+    conn.executescript(
+        """
+        PRAGMA journal_mode=WAL;
+        PRAGMA synchronous=NORMAL;
+        PRAGMA temp_store=MEMORY;
+        PRAGMA cache_size=-64000;
+        """
+    )
+    return conn
+
+@st.cache_resource
+def get_conn() -> sqlite3.Connection:
+    # Lesende Verbindung pro Prozess, von allen Sessions gemeinsam genutzt.
+    # Dank WAL sieht sie nur bestätigte Daten, nie eine offene Schreibtransaktion.
+    return open_conn()
+
+@st.cache_resource
+def get_write_conn() -> sqlite3.Connection:
+    # Eigene Verbindung für Schreibzugriffe; nur unter get_write_lock() benutzen
+    return open_conn()
+
+@st.cache_resource
+def get_write_lock() -> threading.RLock:
+    # Serialisiert Schreibzugriffe der Sessions auf die Schreibverbindung
+    return threading.RLock()
+
+@contextmanager
+def write_transaction() -> Iterator[sqlite3.Connection]:
+    # IMMEDIATE holt die Schreibsperre sofort, statt erst beim ersten
+    # Schreibzugriff (vermeidet SQLITE_BUSY mitten in der Transaktion)
+    conn = get_write_conn()
+    with get_write_lock():
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            # Auch ein fehlgeschlagenes COMMIT zurückrollen, sonst bleibt die
+            # Verbindung in der offenen Transaktion hängen
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+def insert_rows(conn: sqlite3.Connection, rows) -> int:
+    # Gemeinsamer Einfügepfad für Formular und CSV-Import: ein vorbereitetes
+    # Statement, per executemany über beliebig viele Tupel
+    return conn.executemany(INSERT_SQL, rows).rowcount
+
+def save_rows(rows) -> int:
+    with write_transaction() as conn:
+        return insert_rows(conn, rows)
+
+# Zieltypen für den DuckDB-Import (alle übrigen Spalten als Text)
+DUCKDB_TYPES = {"Menge": "DOUBLE", "Einzelpreis": "DOUBLE", "Jahr": "INTEGER", "Monat": "INTEGER"}
+
+def import_csv_duckdb(csv_bytes: bytes, source_columns: dict[str, str]) -> int:
+    # DuckDB liest die CSV vektorisiert und schreibt über ATTACH direkt in die
+    # SQLite-Datei, ohne Python-Schleife über die Zeilen. source_columns
+    # ordnet jeder DB-Spalte ihren Namen in der CSV-Kopfzeile zu.
+    def quote(name: str) -> str:
+        return '"' + name.replace('"', '""') + '"'
+
+    def literal(value: str) -> str:
+        return "'" + value.replace("'", "''") + "'"
+
+    select = ", ".join(
+        f"CAST({quote(source_columns[col])} AS {DUCKDB_TYPES.get(col, 'VARCHAR')})"
+        for col in DB_COLUMNS
+    )
+    with tempfile.NamedTemporaryFile(suffix=".csv", delete=False) as tmp:
+        tmp.write(csv_bytes)
+    try:
+        con = duckdb.connect()
+        try:
+            con.execute("INSTALL sqlite")
+            con.execute("LOAD sqlite")
+            con.execute(f"ATTACH {literal(str(DB_PATH))} AS s (TYPE SQLITE)")
+            with get_write_lock():
+                return con.execute(
+                    f"INSERT INTO s.einkaeufe ({', '.join(DB_COLUMNS)}) "
+                    f"SELECT {select} FROM read_csv({literal(tmp.name)}, header = true, all_varchar = true)"
+                ).fetchone()[0]
+        finally:
+            con.close()
+    finally:
+        os.unlink(tmp.name)
+
+@st.cache_resource
+def duckdb_sqlite_installed() -> bool:
+    # Prüft ohne Download, ob die DuckDB-Erweiterung "sqlite" lokal vorliegt;
+    # einmal pro Prozess, statt bei jedem Rerun eine DuckDB-Instanz zu öffnen
+    con = duckdb.connect()
+    try:
+        row = con.execute(
+            "SELECT installed FROM duckdb_extensions() WHERE extension_name = 'sqlite_scanner'"
+        ).fetchone()
+    finally:
+        con.close()
+    return bool(row and row[0])
+
+# Schema und Migrationen einmal pro Prozess, nicht bei jedem Rerun
+@st.cache_resource
 def init_db() -> None:
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute(
+    with write_transaction() as conn:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS einkaeufe (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                Material TEXT,
+                Materialkurztext TEXT,
+                Werk TEXT,
+                Kostenstelle TEXT,
+                Kostenstellenbez TEXT,
+                Menge REAL,
+                Einzelpreis REAL,
+                Warengruppe TEXT,
+                Jahr INTEGER,
+                Monat INTEGER,
+                Lieferant TEXT,
+                Timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
         """
-        CREATE TABLE IF NOT EXISTS einkaeufe (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            Material TEXT,
-            Materialkurztext TEXT,
-            Werk TEXT,
-            Kostenstelle TEXT,
-            Kostenstellenbez TEXT,
-            Menge REAL,
-            Einzelpreis REAL,
-            Warengruppe TEXT,
-            Jahr INTEGER,
-            Monat INTEGER,
-            Lieferant TEXT,
-            Timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
         )
-    """
+        # Gesamtwert als virtuelle Spalte, damit Summen in SQLite laufen.
+        # table_xinfo statt table_info, da letzteres generierte Spalten auslässt.
+        columns = {row[1] for row in conn.execute("PRAGMA table_xinfo(einkaeufe)")}
+        if "Gesamt" not in columns:
+            conn.execute(
+                "ALTER TABLE einkaeufe ADD COLUMN "
+                "Gesamt REAL GENERATED ALWAYS AS (Einzelpreis * Menge) VIRTUAL"
+            )
+        create_indexes(conn)
+
+@st.cache_data(ttl=30)
+def get_row_count() -> int:
+    return get_conn().execute("SELECT COUNT(*) FROM einkaeufe").fetchone()[0]
+
+# Zeilen pro Seite in der Ansicht "Alle Einkäufe"
+PAGE_SIZE = 500
+
+@st.cache_data(ttl=120, max_entries=32)
+def get_page(page: int) -> pd.DataFrame:
+    # id als zweites Sortierkriterium hält die Seiten bei gleichem Timestamp stabil.
+    # Spalten explizit, damit die virtuelle Spalte Gesamt nicht mitkommt.
+    return pd.read_sql_query(
+        f"SELECT id, {', '.join(DB_COLUMNS)}, Timestamp FROM einkaeufe "
+        "ORDER BY Timestamp DESC, id DESC LIMIT ? OFFSET ?",
+        get_conn(),
+        params=(PAGE_SIZE, page * PAGE_SIZE),
     )
-    conn.commit()
-    conn.close()
 
 @st.cache_data(ttl=120)
-def get_all_data() -> pd.DataFrame:
-    with sqlite3.connect(DB_PATH) as conn:
-        return pd.read_sql("SELECT * FROM einkaeufe", conn)
+def get_id_range() -> tuple[int | None, int | None]:
+    return get_conn().execute("SELECT MIN(id), MAX(id) FROM einkaeufe").fetchone()
+
+# Spalten, die in der Analyse gefiltert werden dürfen. Spaltennamen werden
+# in SQL eingesetzt und deshalb gegen diese Liste geprüft.
+FILTER_COLUMNS = ("Kostenstellenbez", "Warengruppe", "Lieferant")
+
+@st.cache_data(ttl=300)
+def get_distinct(col: str) -> list:
+    if col not in FILTER_COLUMNS:
+        raise ValueError(f"Unbekannte Filterspalte: {col}")
+    rows = get_conn().execute(
+        f"SELECT DISTINCT {col} FROM einkaeufe WHERE {col} IS NOT NULL ORDER BY 1"
+    )
+    return [r[0] for r in rows]
+
+def build_where(filters: dict[str, list]) -> tuple[str, list]:
+    # Nur aktive Filter werden zu "Spalte IN (?, ...)"-Bedingungen
+    clauses, params = [], []
+    for col, values in filters.items():
+        if col not in FILTER_COLUMNS:
+            raise ValueError(f"Unbekannte Filterspalte: {col}")
+        if values:
+            clauses.append(f"{col} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    return where, params
+
+# Ergebnisse je Filterkombination; max_entries begrenzt den Cache
+@st.cache_data(ttl=120, max_entries=32)
+def get_summary(filters: dict[str, list]) -> tuple[float, int, float, int]:
+    where, params = build_where(filters)
+    return get_conn().execute(
+        "SELECT COALESCE(SUM(Gesamt), 0), COUNT(DISTINCT Material), "
+        f"COALESCE(SUM(Menge), 0), COUNT(*) FROM einkaeufe{where}",
+        params,
+    ).fetchone()
+
+# Ab pandas 2.0 lassen sich Abfrageergebnisse direkt als Arrow-Spalten laden
+# (pyarrow ist über Streamlit ohnehin installiert)
+ARROW_OPTS = {"dtype_backend": "pyarrow"} if int(pd.__version__.split(".")[0]) >= 2 else {}
+
+# Zeilen pro Seite in der Tabelle "Gefilterte Datensätze"
+ANALYSIS_PAGE_SIZE = 1000
+
+@st.cache_data(ttl=120, max_entries=32)
+def get_analysis_df(filters: dict[str, list], page: int = 0) -> pd.DataFrame:
+    where, params = build_where(filters)
+    df = pd.read_sql_query(
+        "SELECT Material, Menge, Einzelpreis, Warengruppe, Kostenstellenbez, Lieferant "
+        f"FROM einkaeufe{where} ORDER BY id LIMIT ? OFFSET ?",
+        get_conn(),
+        params=[*params, ANALYSIS_PAGE_SIZE, page * ANALYSIS_PAGE_SIZE],
+        **ARROW_OPTS,
+    )
+    # Filterspalten wiederholen wenige Werte -> als Kategorie deutlich kleiner
+    return df.astype({col: "category" for col in FILTER_COLUMNS})
+
+@st.cache_data(ttl=60)
+def get_delete_view(limit: int = 1000) -> pd.DataFrame:
+    # Neueste Einkäufe zuerst, sortiert über idx_timestamp. Nur Spalten, an
+    # denen sich eine Buchung wiedererkennen lässt; Details lädt die Seite
+    # für die gewählte ID separat.
+    return pd.read_sql_query(
+        "SELECT id, Timestamp, Materialkurztext, Kostenstellenbez, Lieferant, Jahr, Monat "
+        "FROM einkaeufe ORDER BY Timestamp DESC, id DESC LIMIT ?",
+        get_conn(),
+        params=(limit,),
+    )
+
+def clear_data_caches() -> None:
+    # Nur Caches leeren, die vom Tabelleninhalt abhängen; statische Caches
+    # (z. B. die Beispiel-CSV) bleiben erhalten.
+    for cached in (get_row_count, get_id_range, get_page, get_distinct,
+                   get_summary, get_analysis_df, get_delete_view):
+        cached.clear()
+
+@st.cache_data
+def example_csv_bytes() -> bytes:
+    example_data = pd.DataFrame([{
+        "Material": "12345678",
+        "Materialkurztext": "Tupfer steril",
+        "Werk": "ROMS",
+        "Kostenstelle": "100010",
+        "Kostenstellenbez": "Station 3A",
+        "Menge": 10,
+        "Einzelpreis": 2.50,
+        "Warengruppe": "Hygienebedarf",
+        "Jahr": 2025,
+        "Monat": 5,
+        "Lieferant": "Hartmann"
+    }])
+    return example_data.to_csv(index=False).encode("utf-8")
+
+def to_records(df: pd.DataFrame):
+    # Nullable-Dtypes (string/Int) liefern pd.NA bzw. NumPy-Skalare, die
+    # sqlite3 nicht binden kann -> in Python-Objekte mit None umwandeln.
+    df = df.astype(object)
+    return df.where(df.notna(), None).itertuples(index=False, name=None)
 
 init_db()
 
@@ -114,65 +377,109 @@ elif page.startswith(":inbox_tray:"):
 
     if uploaded_file:
         try:
-            df = pd.read_csv(uploaded_file)
-
             # Optional: Spalten umbenennen (falls nötig)
-            df.rename(columns={
+            rename_map = {
                 "Menge Ausw.-Zr": "Menge",
                 "Wert Ausw.-Zr": "Wert",
                 "Name Regellieferant": "Lieferant",
                 "Kostenstellenbez.": "Kostenstellenbez"
-            }, inplace=True)
+            }
+
+            # Feste Dtypes ersparen pandas die Typ-Inferenz beim Parsen
+            dtypes = {
+                "Material": "string", "Materialkurztext": "string", "Werk": "string",
+                "Kostenstelle": "string", "Kostenstellenbez": "string",
+                "Warengruppe": "string", "Lieferant": "string",
+                "Menge": "float64", "Einzelpreis": "float64",
+                # Int64 wie die INTEGER-Spalte in SQLite: schmalere Typen würden
+                # z. B. Monat=202505 ohne Fehler auf eine falsche Zahl kürzen
+                "Jahr": "Int64", "Monat": "Int64",
+            }
+            dtypes.update({raw: dtypes[col] for raw, col in rename_map.items() if col in dtypes})
+            read_opts = dict(
+                engine="c",
+                dtype=dtypes,
+                # Nicht benötigte Spalten gar nicht erst parsen
+                usecols=lambda c: rename_map.get(c, c) in DB_COLUMNS,
+            )
+
+            # Spaltenprüfung nur anhand der Kopfzeile, ohne die Datei zu parsen
+            header = pd.read_csv(uploaded_file, nrows=0).columns
+            uploaded_file.seek(0)
+            source_columns = {rename_map.get(c, c): c for c in header}
+            missing = set(DB_COLUMNS) - set(source_columns)
 
-            # Erwartete Spalten in der DB
-            db_columns = [
-                "Material", "Materialkurztext", "Werk", "Kostenstelle", "Kostenstellenbez",
-                "Menge", "Einzelpreis", "Warengruppe", "Jahr", "Monat", "Lieferant"
-            ]
-            missing = set(db_columns) - set(df.columns)
+            # Datei wird beim Import blockweise gelesen
+            chunk_size = 50_000
 
             if missing:
                 st.error(f"❌ Fehlende Spalten: {missing}")
             else:
-                st.dataframe(df.head(), use_container_width=True)
+                # Vorschau nur auf Wunsch parsen und an den Browser senden
+                if st.checkbox("Vorschau anzeigen", value=False):
+                    df = pd.read_csv(uploaded_file, nrows=20, **read_opts).rename(columns=rename_map)
+                    st.dataframe(df, use_container_width=True)
+
+                big_import_help = "Liest sehr große CSV-Dateien mit DuckDB ein (Paket 'duckdb' erforderlich)."
+                if duckdb is not None and not duckdb_sqlite_installed():
+                    big_import_help += (
+                        " Beim ersten Import wird die DuckDB-Erweiterung 'sqlite' "
+                        "heruntergeladen; dafür ist ein Internetzugang nötig."
+                    )
+                big_import = st.checkbox(
+                    "Großer Import (DuckDB)",
+                    value=False,
+                    disabled=duckdb is None,
+                    help=big_import_help,
+                )
 
                 if st.button("✅ Daten importieren"):
                     try:
-                        # Nur gültige Spalten übernehmen
-                        df = df[db_columns]
-
-                        # Batch-Import in SQLite (unter SQLite-Grenze bleiben)
-                        batch_size = 500
-                        with sqlite3.connect(DB_PATH) as conn:
-                            for start in range(0, len(df), batch_size):
-                                chunk = df.iloc[start:start+batch_size]
-                                chunk.to_sql("einkaeufe", conn, if_exists="append", index=False)
-
-                        st.success(f"✅ {len(df)} Zeilen erfolgreich importiert.")
-                        st.cache_data.clear()
+                        if big_import:
+                            imported = import_csv_duckdb(uploaded_file.getvalue(), source_columns)
+                        else:
+                            # Bulk-Import in einer einzigen Transaktion; ohne fsync pro
+                            # Statement. Die Datei wird dabei Block für Block über
+                            # insert_rows() direkt in SQLite geschrieben.
+                            uploaded_file.seek(0)
+                            imported = 0
+                            conn = get_write_conn()
+                            with get_write_lock():
+                                # Kein fsync während des Bulk-Imports
+                                conn.execute("PRAGMA synchronous=OFF")
+                                try:
+                                    with write_transaction():
+                                        # Indizes nur dann verwerfen und nach dem Laden neu
+                                        # aufbauen, wenn der Upload mindestens so groß ist wie
+                                        # die Tabelle; kleine Uploads laufen über die Indizes.
+                                        # Zeilenzahl grob über die Zeilenumbrüche geschätzt.
+                                        existing = conn.execute("SELECT COUNT(*) FROM einkaeufe").fetchone()[0]
+                                        rebuild = uploaded_file.getvalue().count(b"\n") >= existing
+                                        if rebuild:
+                                            drop_indexes(conn)
+                                        for chunk in pd.read_csv(uploaded_file, chunksize=chunk_size, **read_opts):
+                                            # Spalten in DB-Reihenfolge bringen
+                                            chunk = chunk.rename(columns=rename_map)[list(DB_COLUMNS)]
+                                            imported += insert_rows(conn, to_records(chunk))
+                                        if rebuild:
+                                            create_indexes(conn)
+                                finally:
+                                    conn.execute("PRAGMA synchronous=NORMAL")
+
+                        st.success(f"✅ {imported} Zeilen erfolgreich importiert.")
+                        clear_data_caches()
                     except Exception as e:
+                        # Nach einem Abbruch keine zwischengespeicherten Zwischenstände behalten
+                        clear_data_caches()
                         st.error(f"❌ Fehler beim Import: {e}")
         except Exception as e:
             st.error(f"❌ Fehler beim Einlesen der Datei: {e}")
 
     st.markdown("---")
     st.subheader("📄 Beispiel-CSV herunterladen")
-    example_data = pd.DataFrame([{
-        "Material": "12345678",
-        "Materialkurztext": "Tupfer steril",
-        "Werk": "ROMS",
-        "Kostenstelle": "100010",
-        "Kostenstellenbez": "Station 3A",
-        "Menge": 10,
-        "Einzelpreis": 2.50,
-        "Warengruppe": "Hygienebedarf",
-        "Jahr": 2025,
-        "Monat": 5,
-        "Lieferant": "Hartmann"
-    }])
     st.download_button(
         label="📅 Beispiel-CSV herunterladen",
-        data=example_data.to_csv(index=False).encode("utf-8"),
+        data=example_csv_bytes(),
         file_name="beispiel_einkauf.csv",
         mime="text/csv"
     )
@@ -182,28 +489,23 @@ elif page.startswith(":inbox_tray:"):
 # ---------------------------------------------------------------------------
 elif page.startswith(":bar_chart:"):
     st.header(":bar_chart: Analyse der Einkaufsdaten")
-    df = get_all_data()
 
-    if df.empty:
+    if get_row_count() == 0:
         st.warning("Keine Daten zur Analyse vorhanden. Bitte lade zunächst Daten über 'Daten importieren' hoch.")
     else:
         with st.sidebar.expander(":mag_right: Filter", expanded=True):
-            kostenstellen = st.multiselect("Kostenstellenbez.", sorted(df["Kostenstellenbez"].dropna().unique()))
-            warengruppen = st.multiselect("Warengruppe", sorted(df["Warengruppe"].dropna().unique()))
-            lieferanten = st.multiselect("Lieferant", sorted(df["Lieferant"].dropna().unique()))
-
-        mask = pd.Series(True, index=df.index)
-        if kostenstellen:
-            mask &= df["Kostenstellenbez"].isin(kostenstellen)
-        if warengruppen:
-            mask &= df["Warengruppe"].isin(warengruppen)
-        if lieferanten:
-            mask &= df["Lieferant"].isin(lieferanten)
-
-        df_filtered = df[mask]
-        gesamt = (df_filtered["Einzelpreis"] * df_filtered["Menge"]).sum()
-        artikelanzahl = df_filtered["Material"].nunique()
-        avg_preis = gesamt / df_filtered["Menge"].sum() if df_filtered["Menge"].sum() > 0 else 0
+            kostenstellen = st.multiselect("Kostenstellenbez.", get_distinct("Kostenstellenbez"))
+            warengruppen = st.multiselect("Warengruppe", get_distinct("Warengruppe"))
+            lieferanten = st.multiselect("Lieferant", get_distinct("Lieferant"))
+
+        # Kennzahlen werden direkt in SQLite berechnet
+        filters = {
+            "Kostenstellenbez": kostenstellen,
+            "Warengruppe": warengruppen,
+            "Lieferant": lieferanten,
+        }
+        gesamt, artikelanzahl, menge, anzahl = get_summary(filters)
+        avg_preis = gesamt / menge if menge > 0 else 0
 
         col1, col2, col3 = st.columns(3)
         col1.metric("Gesamtkosten", f"{gesamt:,.0f} €")
@@ -211,7 +513,13 @@ elif page.startswith(":bar_chart:"):
         col3.metric("Ø Einzelpreis", f"{avg_preis:,.2f} €")
 
         with st.expander(":mag: Gefilterte Datensätze"):
-            st.dataframe(df_filtered, use_container_width=True, height=400)
+            # Datensätze erst auf Anforderung laden
+            if st.checkbox("Datensätze laden", key="analyse_rows_loaded"):
+                # Seitenweise laden; der Browser erhält höchstens eine Seite
+                pages = max(1, (anzahl - 1) // ANALYSIS_PAGE_SIZE + 1)
+                seite = st.number_input("Seite", min_value=1, max_value=pages, value=1, step=1)
+                st.caption(f"Seite {seite} von {pages} • {anzahl} Datensätze")
+                st.dataframe(get_analysis_df(filters, int(seite) - 1), use_container_width=True, height=400)
 
 # ---------------------------------------------------------------------------
 # Seite: Einkauf erfassen
@@ -237,64 +545,66 @@ elif page.startswith(":heavy_plus_sign:"):
 
         submitted = st.form_submit_button(":floppy_disk: Speichern")
         if submitted:
-            conn = sqlite3.connect(DB_PATH)
-            conn.execute(
-                """
-                INSERT INTO einkaeufe (
-                    Material, Materialkurztext, Werk,
-                    Kostenstelle, Kostenstellenbez,
-                    Menge, Einzelpreis, Warengruppe,
-                    Jahr, Monat, Lieferant
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    material, materialkurz, werk,
-                    kostenstelle, kostenbez,
-                    menge, einzelpreis, warengruppe,
-                    jahr, monat, lieferant
-                ),
-            )
-            conn.commit()
-            conn.close()
+            save_rows([(
+                material, materialkurz, werk,
+                kostenstelle, kostenbez,
+                menge, einzelpreis, warengruppe,
+                jahr, monat, lieferant
+            )])
             st.success(":white_check_mark: Einkauf erfolgreich gespeichert.")
-            st.cache_data.clear()
+            clear_data_caches()
 
 # ---------------------------------------------------------------------------
 # Seite: Alle Einkäufe
 # ---------------------------------------------------------------------------
 elif page.startswith(":open_file_folder:"):
     st.header(":open_file_folder: Alle Einkäufe")
-    df = get_all_data()
-    if df.empty:
+    total = get_row_count()
+    if total == 0:
         st.warning("Keine Daten vorhanden. Bitte lade zunächst Daten über 'Daten importieren' hoch.")
     else:
-        st.dataframe(df, use_container_width=True, height=500)
+        # Nur die aktuelle Seite wird geladen und an den Browser geschickt
+        pages = (total - 1) // PAGE_SIZE + 1
+        seite = st.number_input("Seite", min_value=1, max_value=pages, value=1, step=1)
+        st.caption(f"Seite {seite} von {pages} • {total} Einkäufe insgesamt")
+        st.dataframe(get_page(int(seite) - 1), use_container_width=True, height=500)
 
 # ---------------------------------------------------------------------------
 # Seite: Einkauf löschen
 # ---------------------------------------------------------------------------
 elif page.startswith(":wastebasket:"):
     st.header(":wastebasket: Einkauf löschen")
-    df = get_all_data()
+    lo, hi = get_id_range()
 
-    if df.empty:
+    if hi is None:
         st.warning("Keine Einkäufe zum Löschen vorhanden.")
     else:
-        df = df.sort_values("Timestamp", ascending=False).reset_index(drop=True)
-
-        st.info("Wähle eine ID, um den entsprechenden Einkauf zu löschen.")
-        selected_id = st.selectbox("ID auswählen", df["id"])
-
-        if selected_id:
-            record = df[df["id"] == selected_id].iloc[0]
-            st.write(f"**Material:** {record['Material']} – {record['Materialkurztext']}")
-            st.write(f"**Kostenstelle:** {record['Kostenstellenbez']} • **Lieferant:** {record['Lieferant']}")
-            st.write(f"**Einzelpreis:** {record['Einzelpreis']} € • **Menge:** {record['Menge']}")
+        with st.expander(":mag: Letzte Einkäufe"):
+            # Tabelle erst auf Anforderung laden; Expander-Inhalt wird auch
+            # eingeklappt bei jedem Rerun an den Browser gesendet
+            if st.checkbox("Einkäufe laden", key="delete_rows_loaded"):
+                st.dataframe(get_delete_view(), use_container_width=True, height=300)
+
+        # Zahlenfeld statt Auswahlliste: der Browser erhält nur den ID-Bereich
+        st.info("Gib die ID des Einkaufs ein, der gelöscht werden soll.")
+        selected_id = st.number_input("ID", min_value=int(lo), max_value=int(hi), value=int(hi), step=1)
+
+        # Einzelnen Datensatz direkt über den Primärschlüssel holen
+        record = get_conn().execute(
+            "SELECT Material, Materialkurztext, Kostenstellenbez, Lieferant, Einzelpreis, Menge "
+            "FROM einkaeufe WHERE id = ?",
+            (int(selected_id),),
+        ).fetchone()
+
+        if record is None:
+            st.warning(f"Kein Einkauf mit der ID {int(selected_id)} vorhanden.")
+        else:
+            st.write(f"**Material:** {record[0]} – {record[1]}")
+            st.write(f"**Kostenstelle:** {record[2]} • **Lieferant:** {record[3]}")
+            st.write(f"**Einzelpreis:** {record[4]} € • **Menge:** {record[5]}")
 
             if st.button(":x: Einkauf wirklich löschen?"):
-                conn = sqlite3.connect(DB_PATH)
-                conn.execute("DELETE FROM einkaeufe WHERE id = ?", (int(selected_id),))
-                conn.commit()
-                conn.close()
+                with write_transaction() as conn:
+                    conn.execute("DELETE FROM einkaeufe WHERE id = ?", (int(selected_id),))
                 st.success(":white_check_mark: Einkauf gelöscht. Bitte Seite neu laden, um die Tabelle zu aktualisieren.")
-                st.cache_data.clear()
+                clear_data_caches()